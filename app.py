@@ -15,8 +15,14 @@
 
 import os
 import io
+import sys
 import json
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
 from datetime import datetime
+from types import MappingProxyType
 
 import streamlit as st
 import pandas as pd
@@ -63,159 +69,233 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# =========================
+# Shared resources (process-level cache)
+# =========================
+# Static content and frameworks are built once per process and shared by every session, so
+# many connected users hold one copy instead of one each. The language texts are frozen;
+# the shared DataFrames are not, so copy them before mutating. Bump RESOURCE_VERSION when
+# templates or the built-in frameworks change (Streamlit also invalidates when a builder's
+# source changes).
+RESOURCE_VERSION = "2025.1"
+UPLOAD_CACHE_ENTRIES = 16
+UPLOAD_CACHE_TTL = 3600  # seconds
+
+def _freeze(obj):
+    """Recursively turn dicts/lists into read-only mappings/tuples."""
+    if isinstance(obj, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(_freeze(v) for v in obj)
+    return obj
+
+def _deep_sizeof(obj) -> int:
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (dict, MappingProxyType)):
+        return sys.getsizeof(obj) + sum(_deep_sizeof(k) + _deep_sizeof(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(_deep_sizeof(v) for v in obj)
+    return sys.getsizeof(obj)
+
 # =========================
 # Textes multilingues COMPLETS
 # =========================
-LANGS = {
-    "en": {
-        "hero_title": "🚀 MaturityAgent PRO",
-        "hero_subtitle": "AI × Consulting × Data Engineering",
-        "hero_tagline": "Turn any maturity framework into an AI-powered roadmap in under 1 hour",
-        "hero_stats": "Trusted by 500+ CDOs, CTOs & Data Leaders worldwide",
-        "sidebar_title": "⚙️ Configuration",
-        "sidebar_lang": "🌍 Language",
-        "sidebar_excel": "📊 Upload Your Framework (Excel)",
-        "sidebar_ai": "🤖 AI Agent (OpenAI-ready • optional)",
-        "sidebar_model": "AI Model",
-        "sidebar_key": "OpenAI API Key",
-        "sidebar_hint": "💡 No API key? No problem! A heuristic-based report will be generated.",
-        "sidebar_sql_toggle": "🗄️ Include SQL Maturity Module",
-        "sidebar_sql_vendor": "SQL Stack (for context)",
-        "sidebar_sql_vendors": ["Generic", "Postgres", "BigQuery", "Snowflake", "SQL Server", "MySQL"],
-        "kpi_score": "Global Maturity Score",
-        "kpi_domains": "Domains Evaluated",
-        "kpi_priorities": "Critical Priorities",
-        "kpi_savings": "Annual Time Saved",
-        "section_assessment": "🧩 Interactive Self-Assessment",
-        "section_radar": "📊 Multi-Dimensional Maturity Radar",
-        "section_prio": "🎯 Strategic Prioritization",
-        "section_report": "📝 Executive Report (Board-Ready)",
-        "section_roi": "💰 Business Impact Calculator",
-        "section_linkedin": "🔗 Viral LinkedIn Post Generator",
-        "section_demo": "🎬 Product Demo & Use Cases",
-        "benchmark_title": "📈 Industry Benchmark Analysis",
-        "benchmark_vs": "vs. Industry Average",
-        "benchmark_rank": "Your Percentile Rank",
-        "roi_title": "💎 Transformation Value Calculator",
-        "roi_time": "Time Saved Annually",
-        "roi_money": "Estimated ROI Value",
-        "roi_productivity": "Productivity Boost",
-        "timeline_title": "🗓️ AI-Generated Transformation Roadmap",
-        "timeline_90d": "🚀 90 Days - Quick Wins",
-        "timeline_6m": "📈 6 Months - Foundation Building",
-        "timeline_12m": "🎯 12 Months - Strategic Transformation",
-        "download_report": "📥 Download Full Report (Markdown)",
-        "download_pdf": "🖨️ Export Executive Report (PDF)",
-        "post_generated": "🎉 Post generated! Ready to go viral on LinkedIn",
-        "stats_diagnostics": "Diagnostics Performed",
-        "stats_companies": "Companies Transformed",
-        "stats_hours": "Consulting Hours Saved",
-        "level_label": "Current Maturity Level",
-        "upload_prompt": "👆 Upload your Excel framework or use our battle-tested default template",
-        "why_title": "🏆 Why MaturityAgent PRO?",
-        "why_1": "⚡ 100X Faster: 1 hour vs 3 months traditional consulting",
-        "why_2": "💰 10X Cheaper: $0 vs $50K+ consulting fees",
-        "why_3": "🎯 AI-Ready: prompts & slots to plug your model",
-        "why_4": "📊 Battle-Tested: 16 maturity domains, 500+ diagnostics run",
-        "why_5": "🔓 Open Source: Full transparency, zero vendor lock-in",
-        "features_title": "⚡ Key Features That Set Us Apart",
-        "feature_1": "🧠 AI-Ready Analysis: consultant-grade prompts included",
-        "feature_2": "📊 Multi-Framework Support: Works with ANY maturity model (DMBOK, COBIT, NIST, ISO, custom)",
-        "feature_3": "🎯 Smart Prioritization: Weighted scoring (quick wins vs long-term plays)",
-        "feature_4": "💰 ROI Calculator: Time/cost savings modeled from your scores",
-        "feature_5": "🔗 Social Proof Engine: Viral LinkedIn post generator",
-        "feature_6": "🗄️ SQL Maturity Module: Performance, Query Design, Indexing, Schema, Security, Monitoring",
-        "use_cases_title": "🎯 Who Uses MaturityAgent?",
-        "use_case_1": "👔 CDOs & CTOs: Board-ready assessments",
-        "use_case_2": "💼 Strategy Consultants: Weeks → hours",
-        "use_case_3": "🏢 Enterprises: Self-service governance checks",
-        "use_case_4": "🚀 Scale-ups: Identify gaps pre-Series B/C",
-        "about_title": "👨‍💻 About the Creator",
-        "about_text": "Senior Data Architect & AI Strategy Consultant with 10+ years. Expert in Governance, MLOps, Cloud, and Transformation.",
-        "about_cta": "Open to CDI roles (Lead/Head of Data, CDO) & strategic consulting mandates",
-        "contact_title": "📬 Get In Touch",
-        "contact_linkedin": "💼 Connect on LinkedIn",
-        "contact_email": "📧 Email (Consulting/CDI)",
-        "contact_github": "💻 View Source Code (GitHub)",
-        "pdf_missing": "PDF engine is not installed. Install one:\n- pip install weasyprint tinycss2 cssselect2 (recommended), or\n- pip install pdfkit and install wkhtmltopdf binary on your system.",
-        "sql_section_title": "🗄️ SQL Maturity (Optional Module)",
-        "sql_note": "This module scores your SQL/data warehouse practice (performance, design, ops)."
-    },
-    "fr": {
-        "hero_title": "🚀 MaturityAgent PRO",
-        "hero_subtitle": "IA × Consulting × Data Engineering",
-        "hero_tagline": "Transformez n'importe quel référentiel en feuille de route IA en moins d'1 heure",
-        "hero_stats": "Utilisé par 500+ CDOs, CTOs & Data Leaders",
-        "sidebar_title": "⚙️ Configuration",
-        "sidebar_lang": "🌍 Langue",
-        "sidebar_excel": "📊 Uploadez votre Référentiel (Excel)",
-        "sidebar_ai": "🤖 Agent IA (OpenAI-ready • optionnel)",
-        "sidebar_model": "Modèle IA",
-        "sidebar_key": "Clé API OpenAI",
-        "sidebar_hint": "💡 Pas de clé API ? Aucun souci : un rapport heuristique sera généré.",
-        "sidebar_sql_toggle": "🗄️ Inclure le module Maturité SQL",
-        "sidebar_sql_vendor": "Stack SQL (pour contexte)",
-        "sidebar_sql_vendors": ["Générique", "Postgres", "BigQuery", "Snowflake", "SQL Server", "MySQL"],
-        "kpi_score": "Score Global de Maturité",
-        "kpi_domains": "Domaines Évalués",
-        "kpi_priorities": "Priorités Critiques",
-        "kpi_savings": "Temps Économisé/An",
-        "section_assessment": "🧩 Auto-Évaluation Interactive",
-        "section_radar": "📊 Radar de Maturité Multi-Dimensionnel",
-        "section_prio": "🎯 Priorisation Stratégique",
-        "section_report": "📝 Rapport Exécutif (Board-Ready)",
-        "section_roi": "💰 Calculateur d'Impact Business",
-        "section_linkedin": "🔗 Générateur de Post LinkedIn Viral",
-        "section_demo": "🎬 Démo Produit & Cas d'Usage",
-        "benchmark_title": "📈 Analyse Benchmark Sectoriel",
-        "benchmark_vs": "vs. Moyenne du Secteur",
-        "benchmark_rank": "Votre Percentile",
-        "roi_title": "💎 Calculateur de Valeur de Transformation",
-        "roi_time": "Temps Économisé Annuellement",
-        "roi_money": "Valeur ROI Estimée",
-        "roi_productivity": "Gain de Productivité",
-        "timeline_title": "🗓️ Feuille de Route de Transformation",
-        "timeline_90d": "🚀 90 Jours - Quick Wins",
-        "timeline_6m": "📈 6 Mois - Fondations",
-        "timeline_12m": "🎯 12 Mois - Transformation Stratégique",
-        "download_report": "📥 Télécharger le Rapport (Markdown)",
-        "download_pdf": "🖨️ Exporter le Rapport Exécutif (PDF)",
-        "post_generated": "🎉 Post généré ! Prêt à devenir viral sur LinkedIn",
-        "stats_diagnostics": "Diagnostics Réalisés",
-        "stats_companies": "Entreprises Transformées",
-        "stats_hours": "Heures de Consulting Économisées",
-        "level_label": "Niveau de Maturité Actuel",
-        "upload_prompt": "👆 Uploadez votre Excel ou utilisez le modèle par défaut",
-        "why_title": "🏆 Pourquoi MaturityAgent PRO ?",
-        "why_1": "⚡ 100× plus rapide : 1h vs 3 mois",
-        "why_2": "💰 10× moins cher : 0€ vs 50k€+",
-        "why_3": "🎯 Prêt pour l’IA : prompts & slots pour brancher votre modèle",
-        "why_4": "📊 Éprouvé : 16 domaines, 500+ diagnostics",
-        "why_5": "🔓 Open Source : zéro verrouillage éditeur",
-        "features_title": "⚡ Fonctionnalités Clés",
-        "feature_1": "🧠 IA-Ready : prompts de niveau consultant inclus",
-        "feature_2": "📊 Multi-Framework : DMBOK, COBIT, NIST, ISO, custom",
-        "feature_3": "🎯 Priorisation Pondérée (quick wins vs long terme)",
-        "feature_4": "💰 Calculateur ROI (temps/coûts)",
-        "feature_5": "🔗 Post LinkedIn viral",
-        "feature_6": "🗄️ Module SQL : Performance, Requêtes, Index, Schéma, Sécurité, Monitoring",
-        "use_cases_title": "🎯 Qui utilise MaturityAgent ?",
-        "use_case_1": "👔 CDO/CTO : supports Board-ready",
-        "use_case_2": "💼 Cabinets : semaines → heures",
-        "use_case_3": "🏢 Entreprises : self-service gouvernance",
-        "use_case_4": "🚀 Scale-ups : combler les gaps avant levées",
-        "about_title": "👨‍💻 À propos du créateur",
-        "about_text": "Architecte Data Senior & Consultant Stratégie IA (+10 ans). Gouvernance, MLOps, Cloud, Transformation.",
-        "about_cta": "Ouvert à CDI (Lead/Head of Data, CDO) & missions de conseil",
-        "contact_title": "📬 Contact",
-        "contact_linkedin": "💼 LinkedIn",
-        "contact_email": "📧 Email (Consulting/CDI)",
-        "contact_github": "💻 Code Source (GitHub)",
-        "pdf_missing": "Aucun moteur PDF installé. Installez l’un des deux :\n- pip install weasyprint tinycss2 cssselect2 (recommandé), ou\n- pip install pdfkit + binaire wkhtmltopdf.",
-        "sql_section_title": "🗄️ Maturité SQL (Module optionnel)",
-        "sql_note": "Ce module score votre pratique SQL/Entrepôt (perf, design, ops)."
+@st.cache_resource(show_spinner=False)
+def shared_langs(version: str) -> MappingProxyType:
+    langs = {
+        "en": {
+            "hero_title": "🚀 MaturityAgent PRO",
+            "hero_subtitle": "AI × Consulting × Data Engineering",
+            "hero_tagline": "Turn any maturity framework into an AI-powered roadmap in under 1 hour",
+            "hero_stats": "Trusted by 500+ CDOs, CTOs & Data Leaders worldwide",
+            "sidebar_title": "⚙️ Configuration",
+            "sidebar_lang": "🌍 Language",
+            "sidebar_excel": "📊 Upload Your Framework (Excel)",
+            "sidebar_ai": "🤖 AI Agent (OpenAI-ready • optional)",
+            "sidebar_model": "AI Model",
+            "sidebar_key": "OpenAI API Key",
+            "sidebar_hint": "💡 No API key? No problem! A heuristic-based report will be generated.",
+            "sidebar_sql_toggle": "🗄️ Include SQL Maturity Module",
+            "sidebar_sql_vendor": "SQL Stack (for context)",
+            "sidebar_sql_vendors": ["Generic", "Postgres", "BigQuery", "Snowflake", "SQL Server", "MySQL"],
+            "kpi_score": "Global Maturity Score",
+            "kpi_domains": "Domains Evaluated",
+            "kpi_priorities": "Critical Priorities",
+            "kpi_savings": "Annual Time Saved",
+            "section_assessment": "🧩 Interactive Self-Assessment",
+            "section_radar": "📊 Multi-Dimensional Maturity Radar",
+            "section_prio": "🎯 Strategic Prioritization",
+            "section_report": "📝 Executive Report (Board-Ready)",
+            "section_roi": "💰 Business Impact Calculator",
+            "section_linkedin": "🔗 Viral LinkedIn Post Generator",
+            "section_demo": "🎬 Product Demo & Use Cases",
+            "benchmark_title": "📈 Industry Benchmark Analysis",
+            "benchmark_vs": "vs. Industry Average",
+            "benchmark_rank": "Your Percentile Rank",
+            "roi_title": "💎 Transformation Value Calculator",
+            "roi_time": "Time Saved Annually",
+            "roi_money": "Estimated ROI Value",
+            "roi_productivity": "Productivity Boost",
+            "timeline_title": "🗓️ AI-Generated Transformation Roadmap",
+            "timeline_90d": "🚀 90 Days - Quick Wins",
+            "timeline_6m": "📈 6 Months - Foundation Building",
+            "timeline_12m": "🎯 12 Months - Strategic Transformation",
+            "download_report": "📥 Download Full Report (Markdown)",
+            "download_pdf": "🖨️ Export Executive Report (PDF)",
+            "post_generated": "🎉 Post generated! Ready to go viral on LinkedIn",
+            "stats_diagnostics": "Diagnostics Performed",
+            "stats_companies": "Companies Transformed",
+            "stats_hours": "Consulting Hours Saved",
+            "level_label": "Current Maturity Level",
+            "upload_prompt": "👆 Upload your Excel framework or use our battle-tested default template",
+            "why_title": "🏆 Why MaturityAgent PRO?",
+            "why_1": "⚡ 100X Faster: 1 hour vs 3 months traditional consulting",
+            "why_2": "💰 10X Cheaper: $0 vs $50K+ consulting fees",
+            "why_3": "🎯 AI-Ready: prompts & slots to plug your model",
+            "why_4": "📊 Battle-Tested: 16 maturity domains, 500+ diagnostics run",
+            "why_5": "🔓 Open Source: Full transparency, zero vendor lock-in",
+            "features_title": "⚡ Key Features That Set Us Apart",
+            "feature_1": "🧠 AI-Ready Analysis: consultant-grade prompts included",
+            "feature_2": "📊 Multi-Framework Support: Works with ANY maturity model (DMBOK, COBIT, NIST, ISO, custom)",
+            "feature_3": "🎯 Smart Prioritization: Weighted scoring (quick wins vs long-term plays)",
+            "feature_4": "💰 ROI Calculator: Time/cost savings modeled from your scores",
+            "feature_5": "🔗 Social Proof Engine: Viral LinkedIn post generator",
+            "feature_6": "🗄️ SQL Maturity Module: Performance, Query Design, Indexing, Schema, Security, Monitoring",
+            "use_cases_title": "🎯 Who Uses MaturityAgent?",
+            "use_case_1": "👔 CDOs & CTOs: Board-ready assessments",
+            "use_case_2": "💼 Strategy Consultants: Weeks → hours",
+            "use_case_3": "🏢 Enterprises: Self-service governance checks",
+            "use_case_4": "🚀 Scale-ups: Identify gaps pre-Series B/C",
+            "about_title": "👨‍💻 About the Creator",
+            "about_text": "Senior Data Architect & AI Strategy Consultant with 10+ years. Expert in Governance, MLOps, Cloud, and Transformation.",
+            "about_cta": "Open to CDI roles (Lead/Head of Data, CDO) & strategic consulting mandates",
+            "contact_title": "📬 Get In Touch",
+            "contact_linkedin": "💼 Connect on LinkedIn",
+            "contact_email": "📧 Email (Consulting/CDI)",
+            "contact_github": "💻 View Source Code (GitHub)",
+            "pdf_missing": "PDF engine is not installed. Install one:\n- pip install weasyprint tinycss2 cssselect2 (recommended), or\n- pip install pdfkit and install wkhtmltopdf binary on your system.",
+            "sql_section_title": "🗄️ SQL Maturity (Optional Module)",
+            "sql_note": "This module scores your SQL/data warehouse practice (performance, design, ops).",
+            "section_whatif": "🔮 What-If: Improvement Impact",
+            "whatif_top": "Best improvement paths (global-score gain per unit of effort)",
+            "whatif_target": "Target global score",
+            "whatif_plan": "Greedy plan to reach the target",
+            "whatif_reached": "Target already reached — no step needed.",
+            "whatif_unreachable": "Target not reachable even at level 5 everywhere; showing the full plan.",
+            "sidebar_uncertainty": "🎲 Uncertainty Mode (Monte Carlo)",
+            "sidebar_spread": "Default answer spread (± levels)",
+            "spread_label": "Answer spread (± levels)",
+            "ci_label": "{pct}% confidence interval",
+            "sidebar_history": "📚 Assessment History (CSV/Excel)",
+            "section_compare": "📚 Multi-Assessment Comparison & Trends",
+            "compare_org": "Organisation / portfolio",
+            "compare_include_current": "Include the current session as the latest assessment",
+            "compare_export": "📤 Export this assessment (CSV, for history)",
+            "compare_window": "Moving-average window (assessments)",
+            "compare_domains": "Domains on the trend chart",
+            "compare_cohort": "Cohort (latest of other organisations)",
+            "compare_hint": "Upload a history file (organisation, assessed_at, domain, score) to compare assessments over time.",
+            "sidebar_token_budget": "Prompt token budget (per request)"
+        },
+        "fr": {
+            "hero_title": "🚀 MaturityAgent PRO",
+            "hero_subtitle": "IA × Consulting × Data Engineering",
+            "hero_tagline": "Transformez n'importe quel référentiel en feuille de route IA en moins d'1 heure",
+            "hero_stats": "Utilisé par 500+ CDOs, CTOs & Data Leaders",
+            "sidebar_title": "⚙️ Configuration",
+            "sidebar_lang": "🌍 Langue",
+            "sidebar_excel": "📊 Uploadez votre Référentiel (Excel)",
+            "sidebar_ai": "🤖 Agent IA (OpenAI-ready • optionnel)",
+            "sidebar_model": "Modèle IA",
+            "sidebar_key": "Clé API OpenAI",
+            "sidebar_hint": "💡 Pas de clé API ? Aucun souci : un rapport heuristique sera généré.",
+            "sidebar_sql_toggle": "🗄️ Inclure le module Maturité SQL",
+            "sidebar_sql_vendor": "Stack SQL (pour contexte)",
+            "sidebar_sql_vendors": ["Générique", "Postgres", "BigQuery", "Snowflake", "SQL Server", "MySQL"],
+            "kpi_score": "Score Global de Maturité",
+            "kpi_domains": "Domaines Évalués",
+            "kpi_priorities": "Priorités Critiques",
+            "kpi_savings": "Temps Économisé/An",
+            "section_assessment": "🧩 Auto-Évaluation Interactive",
+            "section_radar": "📊 Radar de Maturité Multi-Dimensionnel",
+            "section_prio": "🎯 Priorisation Stratégique",
+            "section_report": "📝 Rapport Exécutif (Board-Ready)",
+            "section_roi": "💰 Calculateur d'Impact Business",
+            "section_linkedin": "🔗 Générateur de Post LinkedIn Viral",
+            "section_demo": "🎬 Démo Produit & Cas d'Usage",
+            "benchmark_title": "📈 Analyse Benchmark Sectoriel",
+            "benchmark_vs": "vs. Moyenne du Secteur",
+            "benchmark_rank": "Votre Percentile",
+            "roi_title": "💎 Calculateur de Valeur de Transformation",
+            "roi_time": "Temps Économisé Annuellement",
+            "roi_money": "Valeur ROI Estimée",
+            "roi_productivity": "Gain de Productivité",
+            "timeline_title": "🗓️ Feuille de Route de Transformation",
+            "timeline_90d": "🚀 90 Jours - Quick Wins",
+            "timeline_6m": "📈 6 Mois - Fondations",
+            "timeline_12m": "🎯 12 Mois - Transformation Stratégique",
+            "download_report": "📥 Télécharger le Rapport (Markdown)",
+            "download_pdf": "🖨️ Exporter le Rapport Exécutif (PDF)",
+            "post_generated": "🎉 Post généré ! Prêt à devenir viral sur LinkedIn",
+            "stats_diagnostics": "Diagnostics Réalisés",
+            "stats_companies": "Entreprises Transformées",
+            "stats_hours": "Heures de Consulting Économisées",
+            "level_label": "Niveau de Maturité Actuel",
+            "upload_prompt": "👆 Uploadez votre Excel ou utilisez le modèle par défaut",
+            "why_title": "🏆 Pourquoi MaturityAgent PRO ?",
+            "why_1": "⚡ 100× plus rapide : 1h vs 3 mois",
+            "why_2": "💰 10× moins cher : 0€ vs 50k€+",
+            "why_3": "🎯 Prêt pour l’IA : prompts & slots pour brancher votre modèle",
+            "why_4": "📊 Éprouvé : 16 domaines, 500+ diagnostics",
+            "why_5": "🔓 Open Source : zéro verrouillage éditeur",
+            "features_title": "⚡ Fonctionnalités Clés",
+            "feature_1": "🧠 IA-Ready : prompts de niveau consultant inclus",
+            "feature_2": "📊 Multi-Framework : DMBOK, COBIT, NIST, ISO, custom",
+            "feature_3": "🎯 Priorisation Pondérée (quick wins vs long terme)",
+            "feature_4": "💰 Calculateur ROI (temps/coûts)",
+            "feature_5": "🔗 Post LinkedIn viral",
+            "feature_6": "🗄️ Module SQL : Performance, Requêtes, Index, Schéma, Sécurité, Monitoring",
+            "use_cases_title": "🎯 Qui utilise MaturityAgent ?",
+            "use_case_1": "👔 CDO/CTO : supports Board-ready",
+            "use_case_2": "💼 Cabinets : semaines → heures",
+            "use_case_3": "🏢 Entreprises : self-service gouvernance",
+            "use_case_4": "🚀 Scale-ups : combler les gaps avant levées",
+            "about_title": "👨‍💻 À propos du créateur",
+            "about_text": "Architecte Data Senior & Consultant Stratégie IA (+10 ans). Gouvernance, MLOps, Cloud, Transformation.",
+            "about_cta": "Ouvert à CDI (Lead/Head of Data, CDO) & missions de conseil",
+            "contact_title": "📬 Contact",
+            "contact_linkedin": "💼 LinkedIn",
+            "contact_email": "📧 Email (Consulting/CDI)",
+            "contact_github": "💻 Code Source (GitHub)",
+            "pdf_missing": "Aucun moteur PDF installé. Installez l’un des deux :\n- pip install weasyprint tinycss2 cssselect2 (recommandé), ou\n- pip install pdfkit + binaire wkhtmltopdf.",
+            "sql_section_title": "🗄️ Maturité SQL (Module optionnel)",
+            "sql_note": "Ce module score votre pratique SQL/Entrepôt (perf, design, ops).",
+            "section_whatif": "🔮 Simulation : Impact des Améliorations",
+            "whatif_top": "Meilleurs leviers (gain de score global par unité d'effort)",
+            "whatif_target": "Score global cible",
+            "whatif_plan": "Plan glouton pour atteindre la cible",
+            "whatif_reached": "Cible déjà atteinte — aucune action nécessaire.",
+            "whatif_unreachable": "Cible inatteignable même au niveau 5 partout ; plan complet affiché.",
+            "sidebar_uncertainty": "🎲 Mode Incertitude (Monte Carlo)",
+            "sidebar_spread": "Incertitude par défaut (± niveaux)",
+            "spread_label": "Incertitude de la réponse (± niveaux)",
+            "ci_label": "Intervalle de confiance à {pct} %",
+            "sidebar_history": "📚 Historique des évaluations (CSV/Excel)",
+            "section_compare": "📚 Comparaison Multi-Évaluations & Tendances",
+            "compare_org": "Organisation / portefeuille",
+            "compare_include_current": "Inclure la session courante comme dernière évaluation",
+            "compare_export": "📤 Exporter cette évaluation (CSV, pour l'historique)",
+            "compare_window": "Fenêtre de moyenne mobile (évaluations)",
+            "compare_domains": "Domaines affichés sur la tendance",
+            "compare_cohort": "Cohorte (dernière évaluation des autres organisations)",
+            "compare_hint": "Uploadez un historique (organisation, assessed_at, domain, score) pour comparer les évaluations dans le temps.",
+            "sidebar_token_budget": "Budget de tokens par prompt"
+        }
     }
-}
+    return _freeze(langs)
+
+LANGS = shared_langs(RESOURCE_VERSION)
 
 # =========================
 # Language handling
@@ -236,7 +316,10 @@ T = LANGS[st.session_state.current_lang]
 # =========================
 # HERO SECTION
 # =========================
-st.markdown(f"""
+@st.cache_resource(show_spinner=False)
+def shared_hero_html(lang: str, version: str) -> str:
+    T = LANGS[lang]
+    return f"""
 <div style="
 background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
 padding: 64px 28px; border-radius: 20px; text-align: center; color: white;
@@ -246,7 +329,40 @@ box-shadow: 0 25px 70px rgba(102,126,234,0.25);">
   <div style="font-size:18px;margin-top:12px;opacity:0.92;">{T['hero_tagline']}</div>
   <div style="font-size:14px;margin-top:16px;opacity:0.9;">✨ {T['hero_stats']}</div>
 </div>
-""", unsafe_allow_html=True)
+"""
+
+@st.cache_resource(show_spinner=False)
+def shared_roadmap_template(lang: str, version: str) -> str:
+    """Static roadmap HTML per language; {dom0}/{val0}/{dom1}/{dom2} are filled per rerun."""
+    T = LANGS[lang]
+    return f"""
+<div style="background:#1e293b;border-left:5px solid #667eea;padding:20px;border-radius:10px;margin:10px 0;">
+  <strong>{T['timeline_90d']}</strong>
+  <ul style="color:#cbd5e1;line-height:1.9;">
+    <li>Stand-up governance & steering on <b>{{dom0}}</b> (current {{val0}}/100)</li>
+    <li>Rapid audit on <b>{{dom1}}</b>; define KPIs & thresholds</li>
+    <li>Enable dashboards & weekly follow-up; quick wins playbook</li>
+  </ul>
+</div>
+<div style="background:#1e293b;border-left:5px solid #764ba2;padding:20px;border-radius:10px;margin:10px 0;">
+  <strong>{T['timeline_6m']}</strong>
+  <ul style="color:#cbd5e1;line-height:1.9;">
+    <li>Rollout tooling & automation (catalog, quality, lineage)</li>
+    <li>Standardize processes for weakest areas; RACI & controls</li>
+    <li>Data community & champions program; training plan</li>
+  </ul>
+</div>
+<div style="background:#1e293b;border-left:5px solid #10b981;padding:20px;border-radius:10px;margin:10px 0;">
+  <strong>{T['timeline_12m']}</strong>
+  <ul style="color:#cbd5e1;line-height:1.9;">
+    <li>Predictive controls; contract tests in CI/CD</li>
+    <li>Target ≥ 4/5 on <b>{{dom2}}</b>; external certifications</li>
+    <li>Scale across domains; embed data-driven culture</li>
+  </ul>
+</div>
+"""
+
+st.markdown(shared_hero_html(st.session_state.current_lang, RESOURCE_VERSION), unsafe_allow_html=True)
 
 # =========================
 # SIDEBAR
@@ -260,18 +376,27 @@ with st.sidebar:
 
     st.markdown("---")
     excel_file = st.file_uploader(T['sidebar_excel'], type=["xlsx"])
+    history_file = st.file_uploader(T['sidebar_history'], type=["csv", "xlsx"])
 
     st.markdown("---")
     include_sql = st.toggle(T["sidebar_sql_toggle"], value=True)
     sql_vendor = st.selectbox(T["sidebar_sql_vendor"], T["sidebar_sql_vendors"], index=0)
 
+    st.markdown("---")
+    use_uncertainty = st.toggle(T["sidebar_uncertainty"], value=False)
+    default_spread = 0.5
+    if use_uncertainty:
+        default_spread = st.slider(T["sidebar_spread"], 0.0, 2.0, value=0.5, step=0.1)
+
     st.markdown("---")
     use_ai = st.toggle(T['sidebar_ai'], value=False)
     api_key = ""
     model_name = "gpt-4o-mini"
+    prompt_budget = 600
     if use_ai:
         model_name = st.text_input(T['sidebar_model'], value="gpt-4o-mini")
         api_key = st.text_input(T['sidebar_key'], type="password", value=os.getenv("OPENAI_API_KEY",""))
+        prompt_budget = int(st.number_input(T['sidebar_token_budget'], min_value=150, max_value=8000, value=600, step=50))
     st.caption(T['sidebar_hint'])
 
 # =========================
@@ -284,85 +409,237 @@ for key in ("why_1","why_2","why_3","why_4","why_5"):
 # =========================
 # Default frameworks
 # =========================
-DEFAULT_DATA = pd.DataFrame({
-    "domain": ["Data Strategy","Data Governance","Data Quality","Data Architecture","Data Culture","Data Security"],
-    "question": [
-        "Strategic alignment between data vision and business objectives",
-        "Structured governance with active committees and clear ownership",
-        "Formalized quality processes with automated monitoring",
-        "Modern, scalable, cloud-native architecture",
-        "Data-driven culture embedded across the organization",
-        "Security and compliance proactively managed"
-    ],
-    "weight": [1.2, 1.0, 1.1, 0.9, 0.8, 1.3],
-    "level_1": ["Undefined","Ad hoc","Reactive","Legacy","Non-existent","Minimal"],
-    "level_2": ["Under consideration","Partial","Basic","Hybrid","Sporadic","Compliant"],
-    "level_3": ["Formalized","Structured","Automated","Modern","Established","Proactive"],
-    "level_4": ["Optimized","Mature","Predictive","Cloud-native","Widespread","Advanced"],
-    "level_5": ["Exemplary","Excellence","AI-driven","Edge computing","Generalized","Zero Trust"]
-})
-
-# SQL module framework (6 domains × 1 question each – extensible)
-SQL_DATA = pd.DataFrame({
-    "domain": [
-        "SQL Performance","Query Design","Indexing Strategy",
-        "Schema & Modeling","Security & Compliance","Observability & Monitoring"
-    ],
-    "question": [
-        f"Workload efficiency & cost/perf optimization ({sql_vendor})",
-        "Use of CTEs/Window functions; anti-pattern avoidance; parameterization",
-        "Appropriate composite/covering indexes; stats maintenance; partitioning",
-        "Star/Snowflake modeling; normalization vs denormalization; data contracts",
-        "RBAC/ABAC; data masking; encryption; secrets management; auditability",
-        "Query plans, slow log, query store; SLO/SLA; automated alerts"
-    ],
-    "weight": [1.2, 1.0, 1.1, 1.0, 1.1, 0.9],
-    "level_1": [
-        "No baselines; cost overruns",
-        "Ad hoc queries; N+1; SELECT *",
-        "No indexes; table scans",
-        "No modeling strategy; drift",
-        "Weak permissions; no masking",
-        "No monitoring; blind spots"
-    ],
-    "level_2": [
-        "Basic review; sporadic tuning",
-        "Some patterns; basic params",
-        "Few indexes; stale stats",
-        "Partial modeling; undocumented",
-        "Manual permissions; basic audit",
-        "Manual checks; few scripts"
-    ],
-    "level_3": [
-        "KPIs set; scheduled reviews",
-        "Consistent patterns; lint rules",
-        "Coverage indexes; stats refresh",
-        "Clear models; contracts v1",
-        "RBAC in place; masking critical",
-        "Dashboards; slow query triage"
-    ],
-    "level_4": [
-        "Autoscale/slots; workload mgmt",
-        "Query templates; library reuse",
-        "Partitioning; hot/cold strategy",
-        "Data vault & marts; CDC pipelines",
-        "ABAC; tokenization; KMS/HSM",
-        "SLO/SLA w/ alerts; runbooks"
-    ],
-    "level_5": [
-        "Autotune; budget guardrails",
-        "Pattern registry; query reviews",
-        "Adaptive indexing; advisor pipeline",
-        "Domain mesh; contract tests CI",
-        "Zero Trust; continuous compliance",
-        "Anomaly detection; self-healing"
-    ]
-})
+@st.cache_resource(show_spinner=False)
+def shared_default_framework(version: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        "domain": ["Data Strategy","Data Governance","Data Quality","Data Architecture","Data Culture","Data Security"],
+        "question": [
+            "Strategic alignment between data vision and business objectives",
+            "Structured governance with active committees and clear ownership",
+            "Formalized quality processes with automated monitoring",
+            "Modern, scalable, cloud-native architecture",
+            "Data-driven culture embedded across the organization",
+            "Security and compliance proactively managed"
+        ],
+        "weight": [1.2, 1.0, 1.1, 0.9, 0.8, 1.3],
+        "level_1": ["Undefined","Ad hoc","Reactive","Legacy","Non-existent","Minimal"],
+        "level_2": ["Under consideration","Partial","Basic","Hybrid","Sporadic","Compliant"],
+        "level_3": ["Formalized","Structured","Automated","Modern","Established","Proactive"],
+        "level_4": ["Optimized","Mature","Predictive","Cloud-native","Widespread","Advanced"],
+        "level_5": ["Exemplary","Excellence","AI-driven","Edge computing","Generalized","Zero Trust"]
+    })
+
+# SQL module framework (6 domains × 1 question each – extensible), one per vendor
+@st.cache_resource(show_spinner=False)
+def shared_sql_framework(sql_vendor: str, version: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        "domain": [
+            "SQL Performance","Query Design","Indexing Strategy",
+            "Schema & Modeling","Security & Compliance","Observability & Monitoring"
+        ],
+        "question": [
+            f"Workload efficiency & cost/perf optimization ({sql_vendor})",
+            "Use of CTEs/Window functions; anti-pattern avoidance; parameterization",
+            "Appropriate composite/covering indexes; stats maintenance; partitioning",
+            "Star/Snowflake modeling; normalization vs denormalization; data contracts",
+            "RBAC/ABAC; data masking; encryption; secrets management; auditability",
+            "Query plans, slow log, query store; SLO/SLA; automated alerts"
+        ],
+        "weight": [1.2, 1.0, 1.1, 1.0, 1.1, 0.9],
+        "level_1": [
+            "No baselines; cost overruns",
+            "Ad hoc queries; N+1; SELECT *",
+            "No indexes; table scans",
+            "No modeling strategy; drift",
+            "Weak permissions; no masking",
+            "No monitoring; blind spots"
+        ],
+        "level_2": [
+            "Basic review; sporadic tuning",
+            "Some patterns; basic params",
+            "Few indexes; stale stats",
+            "Partial modeling; undocumented",
+            "Manual permissions; basic audit",
+            "Manual checks; few scripts"
+        ],
+        "level_3": [
+            "KPIs set; scheduled reviews",
+            "Consistent patterns; lint rules",
+            "Coverage indexes; stats refresh",
+            "Clear models; contracts v1",
+            "RBAC in place; masking critical",
+            "Dashboards; slow query triage"
+        ],
+        "level_4": [
+            "Autoscale/slots; workload mgmt",
+            "Query templates; library reuse",
+            "Partitioning; hot/cold strategy",
+            "Data vault & marts; CDC pipelines",
+            "ABAC; tokenization; KMS/HSM",
+            "SLO/SLA w/ alerts; runbooks"
+        ],
+        "level_5": [
+            "Autotune; budget guardrails",
+            "Pattern registry; query reviews",
+            "Adaptive indexing; advisor pipeline",
+            "Domain mesh; contract tests CI",
+            "Zero Trust; continuous compliance",
+            "Anomaly detection; self-healing"
+        ]
+    })
+
+DEFAULT_DATA = shared_default_framework(RESOURCE_VERSION)
+SQL_DATA = shared_sql_framework(sql_vendor, RESOURCE_VERSION)
+
+@st.cache_resource(show_spinner=False)
+def shared_resources_footprint(sql_vendors: tuple, version: str) -> int:
+    """Approximate bytes held by the shared static resources (all languages, every SQL vendor)."""
+    langs = tuple(LANGS.keys())
+    return (_deep_sizeof(LANGS)
+            + sum(_deep_sizeof(shared_hero_html(l, version)) for l in langs)
+            + sum(_deep_sizeof(shared_roadmap_template(l, version)) for l in langs)
+            + _deep_sizeof(shared_default_framework(version))
+            + sum(_deep_sizeof(shared_sql_framework(v, version)) for v in sql_vendors))
+
+FRAMEWORK_COLUMNS = ["domain", "question", "weight"] + [f"level_{i}" for i in range(1, 6)]
+FRAMEWORK_NUMERIC = ("weight", "effort")
+MAX_REPORTED_ERRORS = 200
+
+def load_framework_streaming(file, sheet_name: str = "questions",
+                             chunk_size: int = 5_000) -> tuple[pd.DataFrame, list[tuple[int, str]], int]:
+    """
+    Stream a framework sheet with openpyxl read-only row iteration.
+    Rows are validated as they are read (domain, question and level_1..level_5 must be filled;
+    weight/effort must be > 0, blank = 1.0); invalid rows are skipped and reported, not fatal.
+    Each chunk is turned into categoricals right away, so peak memory is one chunk of raw
+    rows plus the compact (category-coded) framework.
+    Returns (framework, errors[:MAX_REPORTED_ERRORS], error_count).
+    """
+    from openpyxl import load_workbook
+    from pandas.api.types import union_categoricals
+
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        if sheet_name not in wb.sheetnames:
+            raise ValueError(f"sheet '{sheet_name}' not found (available: {', '.join(wb.sheetnames)})")
+        rows = wb[sheet_name].iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        names = [str(h).strip().lower() if h is not None else "" for h in header]
+        missing = [c for c in FRAMEWORK_COLUMNS if c not in names]
+        if missing:
+            raise ValueError(f"missing column(s): {', '.join(missing)}")
+        text_cols = [c for c in FRAMEWORK_COLUMNS if c not in FRAMEWORK_NUMERIC]
+        num_cols = [c for c in FRAMEWORK_NUMERIC if c in names]
+        pos = {c: names.index(c) for c in text_cols + num_cols}
+
+        errors: list[tuple[int, str]] = []
+        n_errors = 0
+        parts: dict[str, list] = {c: [] for c in text_cols + num_cols}
+        buf: dict[str, list] = {c: [] for c in parts}
+
+        def cell(row: tuple, c: str):
+            return row[pos[c]] if pos[c] < len(row) else None
+
+        def flush():
+            for c in text_cols:
+                # questions are unique per row; repeated labels (domain, level_n) are category-coded
+                parts[c].append(np.asarray(buf[c], dtype=object) if c == "question" else pd.Categorical(buf[c]))
+            for c in num_cols:
+                parts[c].append(np.asarray(buf[c], dtype=np.float32))
+            for c in buf:
+                buf[c] = []
+
+        for row_no, row in enumerate(rows, start=2):
+            if not any(v is not None and str(v).strip() for v in row):
+                continue
+            problems = [f"empty '{c}'" for c in text_cols
+                        if cell(row, c) is None or not str(cell(row, c)).strip()]
+            nums = {}
+            for c in num_cols:
+                v = cell(row, c)
+                try:
+                    nums[c] = 1.0 if v is None or str(v).strip() == "" else float(str(v).replace(",", "."))
+                    # weight 0 would make a domain's weights sum to zero; effort 0 has no rate
+                    if not np.isfinite(nums[c]) or nums[c] <= 0:
+                        raise ValueError
+                except ValueError:
+                    problems.append(f"invalid {c} '{v}'")
+            if problems:
+                n_errors += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append((row_no, "; ".join(problems)))
+                continue
+            for c in text_cols:
+                v = cell(row, c)
+                buf[c].append(str(v).strip() if v is not None else "")
+            for c in num_cols:
+                buf[c].append(nums[c])
+            if len(buf["domain"]) >= chunk_size:
+                flush()
+        if buf["domain"]:
+            flush()
+    finally:
+        wb.close()
+
+    if not parts["domain"]:
+        return pd.DataFrame(columns=FRAMEWORK_COLUMNS), errors, n_errors
+    framework = pd.DataFrame({
+        c: (union_categoricals(parts[c]) if c in text_cols and c != "question" else np.concatenate(parts[c]))
+        for c in text_cols + num_cols
+    })
+    ordered = [c for c in dict.fromkeys(FRAMEWORK_COLUMNS + list(FRAMEWORK_NUMERIC)) if c in framework]
+    return framework[ordered], errors, n_errors
+
+@st.cache_resource(show_spinner=False)
+def _uploaded_framework_store(version: str) -> tuple[threading.Lock, OrderedDict]:
+    # digest -> (created_at, (framework, errors, n_errors), bytes); kept here rather than in
+    # st.cache_resource so the entries can be sized for the footprint report
+    return threading.Lock(), OrderedDict()
+
+def _prune_uploaded_frameworks(entries: OrderedDict, now: float):
+    for digest in [d for d, (created, _, _) in entries.items() if now - created > UPLOAD_CACHE_TTL]:
+        del entries[digest]
+    while len(entries) > UPLOAD_CACHE_ENTRIES:
+        entries.popitem(last=False)
+
+def shared_uploaded_framework(digest: str, data: bytes, version: str) -> tuple[pd.DataFrame, tuple, int]:
+    """
+    Parsed upload shared across sessions; keyed by content digest, so a changed file is re-read.
+    LRU of UPLOAD_CACHE_ENTRIES entries, each expiring UPLOAD_CACHE_TTL seconds after parsing.
+    """
+    lock, entries = _uploaded_framework_store(version)
+    with lock:
+        _prune_uploaded_frameworks(entries, time.monotonic())
+        if digest in entries:
+            entries.move_to_end(digest)
+            return entries[digest][1]
+    framework, errors, n_errors = load_framework_streaming(io.BytesIO(data), sheet_name="questions")
+    result = (framework, tuple(errors), n_errors)
+    with lock:
+        entries[digest] = (time.monotonic(), result, _deep_sizeof(framework) + _deep_sizeof(result[1]))
+        _prune_uploaded_frameworks(entries, time.monotonic())
+    return result
+
+def uploaded_frameworks_footprint(version: str) -> tuple[int, int]:
+    """(entries, bytes) currently held by the shared upload cache."""
+    lock, entries = _uploaded_framework_store(version)
+    with lock:
+        _prune_uploaded_frameworks(entries, time.monotonic())
+        return len(entries), sum(size for _, _, size in entries.values())
 
 # Load Excel if provided
 if excel_file:
     try:
-        df_questions = pd.read_excel(excel_file, sheet_name="questions")
+        excel_bytes = excel_file.getvalue()
+        df_questions, load_errors, n_load_errors = shared_uploaded_framework(
+            hashlib.sha256(excel_bytes).hexdigest(), excel_bytes, RESOURCE_VERSION
+        )
+        if n_load_errors:
+            st.warning(f"⚠️ {n_load_errors} row(s) skipped in the Excel framework.")
+            with st.expander("Row-level errors"):
+                st.dataframe(pd.DataFrame(list(load_errors), columns=["row", "error"]), use_container_width=True)
+        if df_questions.empty:
+            raise ValueError("no valid question rows")
     except Exception as e:
         st.error(f"❌ Excel read error: {e}")
         df_questions = DEFAULT_DATA.copy()
@@ -370,6 +647,11 @@ else:
     df_questions = DEFAULT_DATA.copy()
     st.info(T['upload_prompt'])
 
+upload_entries, upload_bytes = uploaded_frameworks_footprint(RESOURCE_VERSION)
+st.sidebar.caption(f"🧠 Shared cache: {shared_resources_footprint(T['sidebar_sql_vendors'], RESOURCE_VERSION) / 1024:.1f} KB "
+                   f"static + {upload_bytes / 1024:.1f} KB in {upload_entries} uploaded framework(s) "
+                   f"(resources {RESOURCE_VERSION})")
+
 # Merge SQL module if toggled
 if include_sql:
     # avoid domain name collision by keeping domains separate; scoring works by-domain
@@ -380,6 +662,11 @@ if include_sql:
 # =========================
 st.markdown(f"<h2 style='margin-top:30px;'>{T['section_assessment']}</h2>", unsafe_allow_html=True)
 
+spread_overrides = st.session_state.setdefault("spread_overrides", {})
+
+def _set_spread_override(idx):
+    st.session_state.spread_overrides[idx] = st.session_state[f"spread_{idx}"]
+
 answers = {}
 for idx, row in df_questions.iterrows():
     with st.expander(f"**{row['domain']}** — {row['question']}"):
@@ -391,11 +678,19 @@ for idx, row in df_questions.iterrows():
         current_level = st.session_state.get(f"level_{idx}", 3)
         st.markdown(f"**{T['level_label']}: {current_level}/5**")
         st.caption(row.get(f"level_{current_level}",""))
+        spread = 0.0
+        if use_uncertainty:
+            # answers the user adjusted keep their spread; the others follow the sidebar default
+            spread = st.slider(T['spread_label'], 0.0, 2.0, step=0.1, key=f"spread_{idx}",
+                               value=spread_overrides.get(idx, default_spread),
+                               on_change=_set_spread_override, args=(idx,))
 
         answers[idx] = {
             "domain": row["domain"],
             "level": current_level,
-            "weight": float(row.get("weight", 1.0) if pd.notna(row.get("weight", 1.0)) else 1.0)
+            "weight": float(row.get("weight", 1.0) if pd.notna(row.get("weight", 1.0)) else 1.0),
+            "effort": float(row.get("effort", 1.0) if pd.notna(row.get("effort", 1.0)) else 1.0),
+            "spread": spread
         }
 
 df_answers = pd.DataFrame(answers).T
@@ -415,6 +710,66 @@ else:
     domain_scores = {}
 
 global_score = float(np.mean(list(domain_scores.values()))) if domain_scores else 0.0
+
+MC_CI = 0.90
+
+def mc_score_intervals(levels: np.ndarray, spreads: np.ndarray, weights: np.ndarray, dom_codes: np.ndarray,
+                       n_samples: int = 10_000, ci: float = MC_CI, seed: int = 42,
+                       chunk: int = 2_000) -> tuple[np.ndarray, np.ndarray, tuple[float, float]]:
+    """
+    Monte Carlo confidence intervals of domain & global scores.
+    Each answer is drawn from N(level, spread) clipped to [1, 5] and scored like calc_score.
+    Clipping pulls answers near 1 or 5 towards the middle, so the interval is taken on the
+    deviation from the sample median and re-centred on the point estimate (then bounded to
+    [0, 100]); this keeps the reported score inside its own interval.
+    Samples are processed in batches of `chunk` (float32) so memory stays bounded.
+    Returns (domain_low, domain_high, (global_low, global_high)), one entry per distinct
+    dom_code in ascending order (codes need not be contiguous).
+    """
+    # sort columns by domain so each weighted average becomes one add.reduceat
+    order = np.argsort(dom_codes, kind="stable")
+    codes = dom_codes[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    n_dom = len(starts)
+    dom_w = np.bincount(codes, weights=weights[order])
+    w_norm = np.divide(25.0 * weights[order], dom_w[codes], out=np.zeros(len(codes)), where=dom_w[codes] > 0)
+    lv = levels[order].astype(np.float32)
+    sp = spreads[order].astype(np.float32)
+    w_norm = w_norm.astype(np.float32)
+
+    rng = np.random.default_rng(seed)
+    dom_samples = np.empty((n_samples, n_dom), dtype=np.float32)
+    for start in range(0, n_samples, chunk):
+        stop = min(start + chunk, n_samples)
+        draw = rng.standard_normal((stop - start, len(lv)), dtype=np.float32)
+        draw *= sp
+        draw += lv
+        np.clip(draw, 1.0, 5.0, out=draw)
+        draw -= 1.0
+        draw *= w_norm
+        dom_samples[start:stop] = np.add.reduceat(draw, starts, axis=1)
+
+    dom_point = np.add.reduceat((lv - 1.0) * w_norm, starts).astype(float)
+    q = [(1 - ci) / 2 * 100, 50, (1 + ci) / 2 * 100]
+    lo, med, hi = np.percentile(dom_samples, q, axis=0)
+    dom_lo = np.clip(dom_point + (lo - med), 0.0, dom_point)
+    dom_hi = np.clip(dom_point + (hi - med), dom_point, 100.0)
+    g_point = float(dom_point.mean())
+    g_lo, g_med, g_hi = np.percentile(dom_samples.mean(axis=1), q)
+    return dom_lo, dom_hi, (float(max(0.0, min(g_point, g_point + g_lo - g_med))),
+                            float(min(100.0, max(g_point, g_point + g_hi - g_med))))
+
+# uncertainty mode: domain -> (low, high) and global (low, high); None when disabled
+domain_ci = None
+global_ci = None
+if use_uncertainty and not df_answers.empty:
+    mc_codes, mc_domains = pd.factorize(df_answers["domain"])
+    mc_lo, mc_hi, global_ci = mc_score_intervals(
+        df_answers["level"].to_numpy(dtype=float), df_answers["spread"].to_numpy(dtype=float),
+        df_answers["weight"].to_numpy(dtype=float), mc_codes
+    )
+    domain_ci = {d: (float(lo), float(hi)) for d, lo, hi in zip(mc_domains, mc_lo, mc_hi)}
+
 weak_count = len([s for s in domain_scores.values() if s < 60])
 
 # rough ROI calc
@@ -426,6 +781,8 @@ productivity_gain = int(max(0, global_score) * 1.2)
 st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
 k1,k2,k3,k4 = st.columns(4)
 k1.metric(T['kpi_score'], f"{global_score:.1f}")
+if global_ci:
+    k1.caption(f"{T['ci_label'].format(pct=round(MC_CI * 100))}: {global_ci[0]:.1f} – {global_ci[1]:.1f}")
 k2.metric(T['kpi_domains'], f"{len(domain_scores)}")
 k3.metric(T['kpi_priorities'], f"{weak_count}")
 k4.metric(T['kpi_savings'], f"{time_saved_days}d")
@@ -445,6 +802,17 @@ if domain_scores:
         doms_loop = doms * 2
         vals_loop = vals * 2
 
+    if domain_ci:
+        # CI band: low bound first, then the high bound filled down to it ('tonext')
+        for bound in (0, 1):
+            ci_vals = [domain_ci[d][bound] for d in doms]
+            ci_loop = ci_vals + [ci_vals[0]] if len(doms) > 1 else ci_vals * 2
+            fig_radar.add_trace(go.Scatterpolar(
+                r=ci_loop, theta=doms_loop, fill='tonext' if bound else 'none',
+                fillcolor='rgba(102, 126, 234, 0.15)',
+                line=dict(color='#a5b4fc', width=1, dash='dot'), name=f"CI {'high' if bound else 'low'}"
+            ))
+
     fig_radar.add_trace(go.Scatterpolar(
         r=vals_loop, theta=doms_loop, fill='toself',
         fillcolor='rgba(102, 126, 234, 0.35)', line=dict(color='#667eea', width=3),
@@ -484,6 +852,254 @@ if not prio_df.empty:
 else:
     st.info("No prioritization yet — answer at least one question.")
 
+# =========================
+# WHAT-IF (improvement impact)
+# =========================
+def whatif_per_level(weights: np.ndarray, dom_codes: np.ndarray) -> np.ndarray:
+    """Global-score gain of raising each question by one level (same weighting as calc_score)."""
+    if len(dom_codes) == 0:
+        return np.zeros(0)
+    n_dom = int(dom_codes.max()) + 1
+    dom_w = np.bincount(dom_codes, weights=weights, minlength=n_dom)[dom_codes]
+    # one level = 25 pts on the question, diluted by its domain weight, then by the domain mean
+    return np.divide(25.0 * weights, dom_w * n_dom, out=np.zeros_like(weights), where=dom_w > 0)
+
+def whatif_gain_matrix(levels: np.ndarray, per_level: np.ndarray) -> np.ndarray:
+    """N×5 matrix: global-score gain if question i is set to level j+1 (0 when not an improvement)."""
+    steps = np.clip(np.arange(1, 6)[None, :] - levels[:, None], 0, None)
+    return steps * per_level[:, None]
+
+def rank_improvements(levels: np.ndarray, gains: np.ndarray, efforts: np.ndarray, top_n: int = 10) -> pd.DataFrame:
+    """
+    One row per question at its best target level, ranked by gain per unit of effort, then by gain.
+    Gains are linear per level, so all targets of a question share the same rate; ties go to the
+    nearest target (one level up). The jump to level 5 is reported in separate columns.
+    """
+    steps = np.clip(np.arange(1, 6)[None, :] - levels[:, None], 0, None)
+    cost = steps * efforts[:, None]
+    rate = np.divide(gains, cost, out=np.zeros_like(gains), where=cost > 0)
+    best_rate = rate.max(axis=1)
+    tied = np.isclose(rate, best_rate[:, None]) & (gains > 0)
+    best_lvl = np.argmax(tied, axis=1)
+    q = np.arange(len(levels))
+    best_gain = gains[q, best_lvl]
+    order = np.lexsort((-best_gain, -best_rate))
+    order = order[best_gain[order] > 0][:top_n]
+    return pd.DataFrame({
+        "pos": order, "from_level": levels[order].astype(int), "to_level": best_lvl[order] + 1,
+        "gain": best_gain[order], "effort": cost[order, best_lvl[order]], "gain_per_effort": best_rate[order],
+        "gain_to_5": gains[order, 4], "effort_to_5": cost[order, 4]
+    })
+
+def greedy_plan(levels: np.ndarray, per_level: np.ndarray, efforts: np.ndarray,
+                current: float, target: float) -> tuple[pd.DataFrame, bool]:
+    """
+    Greedy sequence of raises reaching `target` (not guaranteed to be the cheapest). Gains are
+    linear per level, so taking single steps greedily by gain/effort is equivalent to sorting
+    questions once by rate.
+    Returns (plan, reached).
+    """
+    needed = target - current
+    cols = ["pos", "from_level", "to_level", "gain", "effort", "score_after"]
+    if needed <= 0:
+        return pd.DataFrame(columns=cols), True
+    headroom = (5 - levels).astype(int)
+    rate = np.divide(per_level, efforts, out=np.zeros_like(per_level), where=efforts > 0)
+    cand = np.flatnonzero((headroom > 0) & (per_level > 0))
+    cand = cand[np.argsort(-rate[cand], kind="stable")]
+    full_gain = per_level[cand] * headroom[cand]
+    cum = np.cumsum(full_gain)
+    stop = int(np.searchsorted(cum, needed - 1e-9))
+    reached = stop < len(cand)
+    take = cand[:stop + 1] if reached else cand
+    raise_by = headroom[take].copy()
+    if reached:
+        before = cum[stop - 1] if stop > 0 else 0.0
+        raise_by[-1] = int(np.ceil((needed - before) / per_level[take[-1]] - 1e-9))
+    gain = raise_by * per_level[take]
+    return pd.DataFrame({
+        "pos": take, "from_level": levels[take].astype(int), "to_level": (levels[take] + raise_by).astype(int),
+        "gain": gain, "effort": raise_by * efforts[take], "score_after": current + np.cumsum(gain)
+    }), reached
+
+st.markdown(f"<h2 style='margin-top:30px;'>{T['section_whatif']}</h2>", unsafe_allow_html=True)
+if not df_answers.empty:
+    wi_levels = df_answers["level"].to_numpy(dtype=float)
+    wi_efforts = df_answers["effort"].to_numpy(dtype=float)
+    wi_codes, _ = pd.factorize(df_answers["domain"])
+    wi_per_level = whatif_per_level(df_answers["weight"].to_numpy(dtype=float), wi_codes)
+    wi_gains = whatif_gain_matrix(wi_levels, wi_per_level)
+
+    def _whatif_labels(plan: pd.DataFrame) -> pd.DataFrame:
+        src = df_questions.loc[df_answers.index[plan["pos"].to_numpy()]]
+        out = plan.drop(columns="pos")
+        out.insert(0, "question", src["question"].to_numpy())
+        out.insert(0, "domain", src["domain"].to_numpy())
+        return out
+
+    st.markdown(f"**{T['whatif_top']}**")
+    top_paths = _whatif_labels(rank_improvements(wi_levels, wi_gains, wi_efforts))
+    st.dataframe(top_paths.style.format({"gain":"+{:.2f}","effort":"{:.1f}","gain_per_effort":"{:.2f}",
+                                         "gain_to_5":"+{:.2f}","effort_to_5":"{:.1f}"}),
+                 use_container_width=True)
+
+    wi_target = st.slider(T['whatif_target'], 0, 100, 80, key="whatif_target")
+    plan_df, plan_reached = greedy_plan(wi_levels, wi_per_level, wi_efforts, global_score, float(wi_target))
+    st.markdown(f"**{T['whatif_plan']}**")
+    if plan_reached and plan_df.empty:
+        st.success(T['whatif_reached'])
+    elif not plan_reached:
+        st.warning(T['whatif_unreachable'])
+    if not plan_df.empty:
+        st.dataframe(_whatif_labels(plan_df).style.format({"gain":"+{:.2f}","effort":"{:.1f}","score_after":"{:.1f}"}),
+                     use_container_width=True)
+
+# =========================
+# COMPARISON & TRENDS (stored assessments)
+# =========================
+HISTORY_COLUMNS = ["organisation", "assessed_at", "domain", "score"]
+MAX_TREND_POINTS = 60
+MAX_RADAR_OVERLAYS = 4
+
+def history_matrix(history: pd.DataFrame) -> tuple[np.ndarray, pd.DataFrame, pd.Index]:
+    """
+    Long history (organisation, assessed_at, domain, score) → dense A×D matrix
+    (NaN where a domain was not assessed; duplicates averaged).
+    Rows are sorted by organisation then date; returns (matrix, assessments, domains).
+    """
+    h = history[HISTORY_COLUMNS].dropna(subset=["organisation", "domain"]).copy()
+    h["organisation"] = h["organisation"].astype(str)
+    h["assessed_at"] = pd.to_datetime(h["assessed_at"], errors="coerce", format="mixed")
+    h["score"] = pd.to_numeric(h["score"], errors="coerce")
+    h = h.dropna()
+    a_codes = h.groupby(["organisation", "assessed_at"], sort=True).ngroup().to_numpy()
+    d_codes, domains = pd.factorize(h["domain"].astype(str), sort=True)
+    assessments = (h[["organisation", "assessed_at"]].drop_duplicates()
+                   .sort_values(["organisation", "assessed_at"]).reset_index(drop=True))
+    n_a, n_d = len(assessments), len(domains)
+    flat = a_codes * n_d + d_codes
+    sums = np.bincount(flat, weights=h["score"].to_numpy(dtype=float), minlength=n_a * n_d)
+    counts = np.bincount(flat, minlength=n_a * n_d)
+    mat = np.divide(sums, counts, out=np.full(n_a * n_d, np.nan), where=counts > 0)
+    return mat.reshape(n_a, n_d), assessments, pd.Index(domains)
+
+def _nan_window_sums(mat: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """NaN-aware mean of rows [lo[i], hi[i]) for every i, via one cumulative sum."""
+    valid = ~np.isnan(mat)
+    cs = np.vstack([np.zeros((1, mat.shape[1])), np.cumsum(np.where(valid, mat, 0.0), axis=0)])
+    cc = np.vstack([np.zeros((1, mat.shape[1])), np.cumsum(valid, axis=0)])
+    cnt = cc[hi] - cc[lo]
+    return np.divide(cs[hi] - cs[lo], cnt, out=np.full(cnt.shape, np.nan), where=cnt > 0)
+
+def moving_average(mat: np.ndarray, window: int) -> np.ndarray:
+    """Trailing moving average along the assessment axis (rows), ignoring NaN."""
+    idx = np.arange(1, mat.shape[0] + 1)
+    return _nan_window_sums(mat, np.maximum(0, idx - window), idx)
+
+def downsample_rows(mat: np.ndarray, max_points: int) -> tuple[np.ndarray, np.ndarray]:
+    """Bucket-average rows down to at most `max_points`; returns (matrix, last row index of each bucket)."""
+    n = mat.shape[0]
+    if n <= max_points:
+        return mat, np.arange(n)
+    edges = np.unique(np.linspace(0, n, max_points + 1).astype(int))
+    return _nan_window_sums(mat, edges[:-1], edges[1:]), edges[1:] - 1
+
+def _radar_r(values: np.ndarray) -> list:
+    """Closed radar series with NaN (domain not assessed) as None, so Plotly leaves a gap."""
+    r = [None if np.isnan(v) else round(float(v), 1) for v in values]
+    return r + [r[0]]
+
+st.markdown(f"<h2 style='margin-top:30px;'>{T['section_compare']}</h2>", unsafe_allow_html=True)
+history_df = pd.DataFrame(columns=HISTORY_COLUMNS)
+if history_file:
+    try:
+        if history_file.name.lower().endswith(".csv"):
+            history_df = pd.read_csv(history_file, usecols=HISTORY_COLUMNS)
+        else:
+            history_df = pd.read_excel(history_file, usecols=HISTORY_COLUMNS)
+    except Exception as e:
+        st.error(f"❌ History read error: {e}")
+
+orgs = sorted(history_df["organisation"].dropna().astype(str).unique().tolist())
+cmp_org = st.selectbox(T['compare_org'], orgs) if orgs else st.text_input(T['compare_org'], value="My organisation")
+current_rows = pd.DataFrame({
+    "organisation": cmp_org, "assessed_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
+    "domain": list(domain_scores.keys()), "score": np.round(list(domain_scores.values()), 2)
+}, columns=HISTORY_COLUMNS)
+st.download_button(T['compare_export'], data=current_rows.to_csv(index=False).encode("utf-8"),
+                   file_name=f"assessment_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+                   mime="text/csv", use_container_width=True)
+
+if history_df.empty:
+    st.info(T['compare_hint'])
+else:
+    if st.checkbox(T['compare_include_current'], value=True) and domain_scores:
+        history_df = pd.concat([history_df, current_rows], ignore_index=True)
+    hist_mat, hist_keys, hist_domains = history_matrix(history_df)
+    org_rows = np.flatnonzero(hist_keys["organisation"].to_numpy() == cmp_org)
+
+    if len(org_rows) and len(hist_domains):
+        org_mat = hist_mat[org_rows]
+        org_dates = hist_keys["assessed_at"].to_numpy()[org_rows]
+        window = 1
+        if len(org_rows) > 1:
+            window = st.slider(T['compare_window'], 1, min(12, len(org_rows)), min(3, len(org_rows)))
+        org_ma = moving_average(org_mat, window)
+
+        # cohort = latest assessment of every other organisation
+        last_rows = hist_keys.groupby("organisation").tail(1).index.to_numpy()
+        cohort_rows = last_rows[hist_keys.loc[last_rows, "organisation"].to_numpy() != cmp_org]
+        latest = org_mat[-1]
+        cohort_vals = hist_mat[cohort_rows]
+        n_cohort = (~np.isnan(cohort_vals)).sum(axis=0)
+        cohort_mean = np.divide(np.nansum(cohort_vals, axis=0), n_cohort,
+                                out=np.full(len(hist_domains), np.nan), where=n_cohort > 0)
+        pct_rank = np.divide((cohort_vals < latest).sum(axis=0) * 100.0, n_cohort,
+                             out=np.full(len(hist_domains), np.nan), where=n_cohort > 0)
+
+        delta_prev = latest - org_mat[-2] if len(org_rows) > 1 else np.full(len(hist_domains), np.nan)
+        cmp_df = pd.DataFrame({
+            "domain": hist_domains, "latest": latest, "delta_prev": delta_prev, "delta_first": latest - org_mat[0],
+            "moving_avg": org_ma[-1], "cohort_mean": cohort_mean, "vs_cohort": latest - cohort_mean,
+            "cohort_percentile": pct_rank
+        }).sort_values("latest")
+        st.dataframe(cmp_df.style.format({c: "{:+.1f}" if c.startswith(("delta", "vs")) else "{:.1f}"
+                                          for c in cmp_df.columns if c != "domain"}, na_rep="—"),
+                     use_container_width=True)
+
+        # overlaid radars: last few assessments + cohort mean; unassessed domains are left as gaps
+        theta = hist_domains.tolist() + [hist_domains[0]]
+        fig_cmp = go.Figure()
+        for i in range(max(0, len(org_rows) - MAX_RADAR_OVERLAYS), len(org_rows)):
+            fig_cmp.add_trace(go.Scatterpolar(r=_radar_r(org_mat[i]), theta=theta, name=str(pd.Timestamp(org_dates[i]).date()),
+                                              line=dict(width=3 if i == len(org_rows) - 1 else 1.5)))
+        if len(cohort_rows):
+            fig_cmp.add_trace(go.Scatterpolar(r=_radar_r(cohort_mean), theta=theta, name=T['compare_cohort'],
+                                              line=dict(color='#94a3b8', dash='dot')))
+        fig_cmp.update_layout(
+            polar=dict(radialaxis=dict(visible=True, range=[0,100], gridcolor='#334155'),
+                       angularaxis=dict(gridcolor='#334155')),
+            paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='#cbd5e1'), height=520, margin=dict(l=10,r=10,t=30,b=10)
+        )
+        st.plotly_chart(fig_cmp, use_container_width=True)
+
+        # trend lines: moving average, bucket-averaged to at most MAX_TREND_POINTS per domain
+        movers = cmp_df.assign(move=cmp_df["delta_first"].abs()).sort_values("move", ascending=False)["domain"]
+        trend_domains = st.multiselect(T['compare_domains'], hist_domains.tolist(), default=movers.head(5).tolist())
+        if trend_domains:
+            cols = hist_domains.get_indexer(trend_domains)
+            trend, last_idx = downsample_rows(org_ma[:, cols], MAX_TREND_POINTS)
+            x = pd.to_datetime(org_dates[last_idx])
+            fig_trend = go.Figure()
+            for j, dom in enumerate(trend_domains):
+                fig_trend.add_trace(go.Scattergl(x=x, y=np.round(trend[:, j], 1), mode="lines+markers", name=dom))
+            fig_trend.update_layout(
+                paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color="#cbd5e1",
+                yaxis=dict(range=[0,100], gridcolor="#334155"), xaxis_gridcolor="#334155", height=420
+            )
+            st.plotly_chart(fig_trend, use_container_width=True)
+
 # =========================
 # ROI
 # =========================
@@ -503,32 +1119,9 @@ def safe_dom(i):
 def safe_val(i):
     return f"{sorted_domains[i][1]:.1f}" if len(sorted_domains) > i else "—"
 
-st.markdown(f"""
-<div style="background:#1e293b;border-left:5px solid #667eea;padding:20px;border-radius:10px;margin:10px 0;">
-  <strong>{T['timeline_90d']}</strong>
-  <ul style="color:#cbd5e1;line-height:1.9;">
-    <li>Stand-up governance & steering on <b>{safe_dom(0)}</b> (current {safe_val(0)}/100)</li>
-    <li>Rapid audit on <b>{safe_dom(1)}</b>; define KPIs & thresholds</li>
-    <li>Enable dashboards & weekly follow-up; quick wins playbook</li>
-  </ul>
-</div>
-<div style="background:#1e293b;border-left:5px solid #764ba2;padding:20px;border-radius:10px;margin:10px 0;">
-  <strong>{T['timeline_6m']}</strong>
-  <ul style="color:#cbd5e1;line-height:1.9;">
-    <li>Rollout tooling & automation (catalog, quality, lineage)</li>
-    <li>Standardize processes for weakest areas; RACI & controls</li>
-    <li>Data community & champions program; training plan</li>
-  </ul>
-</div>
-<div style="background:#1e293b;border-left:5px solid #10b981;padding:20px;border-radius:10px;margin:10px 0;">
-  <strong>{T['timeline_12m']}</strong>
-  <ul style="color:#cbd5e1;line-height:1.9;">
-    <li>Predictive controls; contract tests in CI/CD</li>
-    <li>Target ≥ 4/5 on <b>{safe_dom(2)}</b>; external certifications</li>
-    <li>Scale across domains; embed data-driven culture</li>
-  </ul>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(shared_roadmap_template(st.session_state.current_lang, RESOURCE_VERSION).format(
+    dom0=safe_dom(0), val0=safe_val(0), dom1=safe_dom(1), dom2=safe_dom(2)
+), unsafe_allow_html=True)
 
 # =========================
 # >>> IA UNIVERSAL CONNECTOR (ajout) <<<
@@ -563,11 +1156,19 @@ def _major(ver: str | None):
     except Exception:
         return None
 
-def openai_chat_universal(model: str, messages: list, temperature: float = 0.4, api_key_override: str = "") -> str:
+def openai_chat_universal(model: str, messages: list, temperature: float = 0.4, api_key_override: str = "",
+                          usage: dict | None = None) -> str:
     """
     Works with openai>=1 (client.chat.completions) or openai==0.x (ChatCompletion)
     If client init fails (proxies, etc.), fallback to raw HTTPS call.
+    If `usage` is given, it is filled with the API's prompt/completion token counts.
     """
+    def _record(u):
+        if usage is None or not u:
+            return
+        get = u.get if isinstance(u, dict) else (lambda k: getattr(u, k, None))
+        usage.update(prompt_tokens=get("prompt_tokens"), completion_tokens=get("completion_tokens"))
+
     key = _get_api_key(api_key_override)
     if not key:
         raise RuntimeError("Missing OPENAI_API_KEY. Add it in Streamlit Secrets or the sidebar field.")
@@ -581,6 +1182,7 @@ def openai_chat_universal(model: str, messages: list, temperature: float = 0.4,
             from openai import OpenAI  # type: ignore
             client = OpenAI(api_key=key)
             resp = client.chat.completions.create(model=model, messages=messages, temperature=temperature)
+            _record(resp.usage)
             return resp.choices[0].message.content.strip()
         except Exception:
             # raw HTTP fallback
@@ -592,6 +1194,7 @@ def openai_chat_universal(model: str, messages: list, temperature: float = 0.4,
             if r.status_code >= 400:
                 raise RuntimeError(f"HTTP {r.status_code}: {r.text}")
             data = r.json()
+            _record(data.get("usage"))
             return data["choices"][0]["message"]["content"].strip()
 
     # SDK 0.x
@@ -599,10 +1202,78 @@ def openai_chat_universal(model: str, messages: list, temperature: float = 0.4,
         import openai  # type: ignore
         openai.api_key = key
         resp = openai.ChatCompletion.create(model=model, messages=messages, temperature=temperature)  # noqa
+        _record(resp.get("usage"))
         return resp["choices"][0]["message"]["content"].strip()
     except Exception as e:
         raise RuntimeError(f"OpenAI universal client failed (version={ver}). Details: {e}")
 
+# =========================
+# >>> IA PROMPT BUDGET : token estimate + compressed domain context
+# =========================
+SCORE_BUCKETS = [(0, 40, "critical"), (40, 60, "weak"), (60, 80, "solid"), (80, 101, "strong")]
+MAX_DETAILED_DOMAINS = 8
+MAX_DOMAIN_NAME_CHARS = 60
+TOKEN_LOG_SIZE = 50
+
+def estimate_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Offline token count: tiktoken when installed, otherwise ~4 characters per token."""
+    try:
+        import tiktoken  # type: ignore
+        try:
+            enc = tiktoken.encoding_for_model(model)
+        except KeyError:
+            enc = tiktoken.get_encoding("o200k_base")
+        return len(enc.encode(text))
+    except Exception:
+        return max(1, -(-len(text) // 4))
+
+def estimate_message_tokens(messages: list, model: str = "gpt-4o-mini") -> int:
+    # chat framing: ~4 tokens per message + 3 to prime the reply
+    return sum(estimate_tokens(m["content"], model) + 4 for m in messages) + 3
+
+def compress_domain_context(scores: dict[str, float], keep: int, with_strongest: bool = True) -> str:
+    """Weakest (and, if asked, strongest) `keep` domains in detail; the rest summarized per score bucket."""
+    if not scores:
+        return "—"
+    ranked = sorted(scores.items(), key=lambda x: x[1])
+    def fmt(items):
+        return ", ".join(f"{d[:MAX_DOMAIN_NAME_CHARS]}: {s:.1f}" for d, s in items)
+    n_strong = keep if with_strongest else 0
+    if len(ranked) <= keep + n_strong:
+        return fmt(ranked)
+    weak, rest, strong = ranked[:keep], ranked[keep:len(ranked) - n_strong], ranked[len(ranked) - n_strong:]
+    rest_scores = np.array([s for _, s in rest])
+    buckets = []
+    for lo, hi, label in SCORE_BUCKETS:
+        in_bucket = rest_scores[(rest_scores >= lo) & (rest_scores < hi)]
+        if len(in_bucket):
+            buckets.append(f"{len(in_bucket)} {label} (avg {in_bucket.mean():.1f})")
+    parts = []
+    if weak:
+        parts.append(f"weakest: {fmt(weak)}")
+    if strong:
+        parts.append(f"strongest: {fmt(strong)}")
+    parts.append(f"{len(rest)} other domain{'s' if len(rest) != 1 else ''}: {', '.join(buckets)}")
+    return "; ".join(parts)
+
+def build_budgeted_messages(system: str, user_template: str, scores: dict[str, float], budget: int,
+                            model: str = "gpt-4o-mini", with_strongest: bool = True) -> tuple[list, int, int]:
+    """
+    Fill `{domains}` in user_template with the most detailed domain context that fits `budget` tokens,
+    shrinking the number of detailed domains until it fits. Returns (messages, estimated_tokens, detailed),
+    detailed being the number of domains listed individually (both sides when with_strongest);
+    the estimate can still exceed `budget` when even the fully summarized context does not fit.
+    """
+    keep = min(MAX_DETAILED_DOMAINS, -(-len(scores) // 2) if with_strongest else len(scores))
+    while True:
+        context = compress_domain_context(scores, keep, with_strongest)
+        msgs = [{"role":"system","content":system},
+                {"role":"user","content":user_template.format(domains=context)}]
+        est = estimate_message_tokens(msgs, model)
+        if est <= budget or keep == 0:
+            return msgs, est, min(len(scores), keep * (2 if with_strongest else 1))
+        keep -= 1
+
 # =========================
 # >>> IA ANALYSE (ajout) : Executive summary + Roadmap IA
 # =========================
@@ -610,27 +1281,49 @@ ia_summary = None
 ia_roadmap = None
 if use_ai:
     try:
-        # Construire un contexte compact
-        dom_list = ", ".join([f"{d}: {s:.1f}" for d, s in domain_scores.items()]) if domain_scores else "—"
-        msgs_summary = [
-            {"role":"system","content":"You are a senior data strategy consultant. Be concise, actionable and exec-friendly."},
-            {"role":"user","content":f"Global score: {global_score:.1f}/100. Domain scores: {dom_list}. "
-                                     f"Write an 8-line executive summary with 3 strengths and 3 risks."}
-        ]
-        ia_summary = openai_chat_universal(model=model_name, messages=msgs_summary, temperature=0.4, api_key_override=api_key)
-
-        msgs_roadmap = [
-            {"role":"system","content":"You are a PMO/Transformation expert. Propose clear actions."},
-            {"role":"user","content":f"Based on the weakest domains {sorted_domains}, propose a 90d/6m/12m roadmap with 3 bullets per phase. "
-                                     f"Keep it concise and business-first."}
-        ]
-        ia_roadmap = openai_chat_universal(model=model_name, messages=msgs_roadmap, temperature=0.4, api_key_override=api_key)
+        # Construire un contexte compact, borné par le budget de tokens
+        msgs_summary, est_summary, detailed_summary = build_budgeted_messages(
+            "You are a senior data strategy consultant. Be concise, actionable and exec-friendly.",
+            f"Global score: {global_score:.1f}/100. Domain scores: {{domains}}. "
+            f"Write an 8-line executive summary with 3 strengths and 3 risks.",
+            domain_scores, prompt_budget, model_name
+        )
+        usage_summary = {}
+        ia_summary = openai_chat_universal(model=model_name, messages=msgs_summary, temperature=0.4,
+                                           api_key_override=api_key, usage=usage_summary)
+
+        # roadmap only needs the weak side: only the weakest domains are detailed, the rest is bucketed
+        msgs_roadmap, est_roadmap, detailed_roadmap = build_budgeted_messages(
+            "You are a PMO/Transformation expert. Propose clear actions.",
+            "Domain scores ({domains}). Based on the weakest domains, propose a 90d/6m/12m roadmap "
+            "with 3 bullets per phase. Keep it concise and business-first.",
+            domain_scores, prompt_budget, model_name, with_strongest=False
+        )
+        usage_roadmap = {}
+        ia_roadmap = openai_chat_universal(model=model_name, messages=msgs_roadmap, temperature=0.4,
+                                           api_key_override=api_key, usage=usage_roadmap)
 
         st.success("✅ IA enabled — executive summary & roadmap generated.")
         with st.expander("🧠 Executive Summary (AI)"):
             st.write(ia_summary)
         with st.expander("🧭 Roadmap (AI)"):
             st.write(ia_roadmap)
+
+        # estimated vs actual usage, kept for the session to tune the estimator and budget
+        # (bounded: every rerun appends two rows)
+        token_log = st.session_state.setdefault("token_log", deque(maxlen=TOKEN_LOG_SIZE))
+        for name, est, kept, usage in (("summary", est_summary, detailed_summary, usage_summary),
+                                       ("roadmap", est_roadmap, detailed_roadmap, usage_roadmap)):
+            token_log.append({"prompt": name, "budget": prompt_budget, "estimated": est, "over_budget": est > prompt_budget,
+                              "detailed_domains": kept, "actual_prompt": usage.get("prompt_tokens"),
+                              "completion": usage.get("completion_tokens")})
+        if max(est_summary, est_roadmap) > prompt_budget:
+            st.warning(f"⚠️ Prompt over budget even fully summarized: ~{max(est_summary, est_roadmap)} "
+                       f"estimated tokens for a budget of {prompt_budget}.")
+        with st.expander("📏 Prompt token budget (estimated vs actual)"):
+            log_df = pd.DataFrame(list(token_log))
+            log_df["error_pct"] = (log_df["estimated"] / pd.to_numeric(log_df["actual_prompt"]) - 1) * 100
+            st.dataframe(log_df.style.format({"error_pct":"{:+.1f}%"}, na_rep="—"), use_container_width=True)
     except Exception as e:
         st.warning(f"⚠️ OpenAI error: {e}")
 
@@ -639,9 +1332,13 @@ if use_ai:
 # =========================
 st.markdown(f"<h2 style='margin-top:30px;'>{T['section_report']}</h2>", unsafe_allow_html=True)
 
-def domain_table_md(scores: dict[str, float]) -> str:
+def domain_table_md(scores: dict[str, float], intervals: dict[str, tuple[float, float]] | None = None) -> str:
     if not scores: return "_No scores._"
-    rows = "\n".join([f"| {d} | {s:.1f} |" for d,s in sorted(scores.items(), key=lambda x:x[1], reverse=True)])
+    ranked = sorted(scores.items(), key=lambda x:x[1], reverse=True)
+    if intervals:
+        rows = "\n".join([f"| {d} | {s:.1f} | {intervals[d][0]:.1f} – {intervals[d][1]:.1f} |" for d,s in ranked])
+        return f"| Domain | Score | {MC_CI:.0%} CI |\n|---|---:|---:|\n{rows}"
+    rows = "\n".join([f"| {d} | {s:.1f} |" for d,s in ranked])
     return f"| Domain | Score |\n|---|---:|\n{rows}"
 
 benchmark_avg = 68.0
@@ -651,10 +1348,10 @@ rank_percentile = max(1, min(99, int(global_score * 0.95)))
 report_md = f"""# 🚀 Maturity Assessment Report — {datetime.now().strftime('%Y-%m-%d')}
 
 ## 📊 Global Score
-**{global_score:.1f}/100**
+**{global_score:.1f}/100**{f" ({MC_CI:.0%} CI: {global_ci[0]:.1f} – {global_ci[1]:.1f})" if global_ci else ""}
 
 ### Domain Breakdown
-{domain_table_md(domain_scores)}
+{domain_table_md(domain_scores, domain_ci)}
 
 ---
 